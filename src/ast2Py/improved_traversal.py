@@ -1,8 +1,12 @@
 import ast
 from enum import Enum
-from typing import List, Dict, Any, TypeAlias, Union, Tuple
+from typing import List, Dict, Any, TypeAlias, Union, Tuple, Iterator, Callable, Set
+import inspect
+import re
 import sys
+from types import FunctionType
 import warnings
+from weakref import WeakKeyDictionary
 
 def __recent_call_stack__(offset:int = 1, n:int = 3) -> List[str]:
     "Helper function to get information about the recent call stack"
@@ -42,27 +46,26 @@ class VisitType(Enum):
     ATTR_SUBSCRIPT = 3
     """Attribute and Subscript access"""
 
-    __readable__ = {
-        ATTRIBUTE: "Attribute",
-        SUBSCRIPT: "Subscript",
-        ATTR_SUBSCRIPT: "Attribute and Subscript"
-    }
-
     index_type = Union[int, str, tuple['index_type', 'index_type']]
 
     @staticmethod
     def __attr_access__(obj: Any, attr: index_type) -> Any:
         """Attribute access"""
-        if not hasattr(obj, attr):
+        try:
+            return getattr(obj, attr)
+        except AttributeError:
             warnings.warn(f"Attribute '{attr}' not found in object of type '{type(obj)}'\n" + "\n".join(__recent_call_stack__()), RuntimeWarning)
-        return getattr(obj, attr)
+            raise
     
     @staticmethod
     def __subscript_access__(obj: Any, index: index_type) -> Any:
         """Subscript access"""
-        if not hasattr(obj, "__getitem__"):
-            warnings.warn(f"Object of type '{type(obj)}' does not support subscripting\n" + "\n".join(__recent_call_stack__()), RuntimeWarning)
-        return obj[index]
+        try:
+            return obj[index]
+        except TypeError:
+            if not hasattr(obj, "__getitem__"):
+                warnings.warn(f"Object of type '{type(obj)}' does not support subscripting\n" + "\n".join(__recent_call_stack__()), RuntimeWarning)
+            raise
     
     @staticmethod
     def __attr_subscript_access__(obj: Any, attr: index_type, index: index_type) -> Any:
@@ -71,24 +74,227 @@ class VisitType(Enum):
     
     def __call__(self, obj: Any, index: index_type) -> Any:
         """Call the respective access method based on the enum value"""
-        if self == VisitType.ATTRIBUTE:
-            return self.__attr_access__(obj, index)
-        elif self == VisitType.SUBSCRIPT:
-            return self.__subscript_access__(obj, index)
-        elif self == VisitType.ATTR_SUBSCRIPT:
-            attr, subscript = index
-            return self.__attr_subscript_access__(obj, attr, subscript)
-        else:
+        access = _VISIT_TYPE_ACCESS.get(self)
+        if access is None:
             raise ValueError(f"Invalid VisitType '{self}'\n" + "\n".join(__recent_call_stack__()))
+        return access(obj, index)
         
     def __str__(self) -> str:
         """String representation of the VisitType"""
-        return self.__readable__[self]
+        return self._str
     
     def __repr__(self) -> str:
         """String representation of the VisitType"""
         return f"{self.__class__.__name__}.{self.value}"
-    
+
+# Readable names of the VisitTypes, stored on each member so that str() is a plain attribute lookup
+_READABLE = {
+    VisitType.ATTRIBUTE: "Attribute",
+    VisitType.SUBSCRIPT: "Subscript",
+    VisitType.ATTR_SUBSCRIPT: "Attribute and Subscript"
+}
+for _member in VisitType:
+    _member._str = _READABLE.get(_member, _member.name)
+del _member
+
+def _attr_subscript_pair_access(obj: Any, index: Tuple[VisitType.index_type, VisitType.index_type]) -> Any:
+    "Helper function to do an Attribute and Subscript access from a single (attr, index) pair"
+    attr, subscript = index
+    return VisitType.__attr_subscript_access__(obj, attr, subscript)
+
+# Access method for each VisitType, so that calling one is a single dict lookup rather than a chain of comparisons
+_VISIT_TYPE_ACCESS = {
+    VisitType.ATTRIBUTE: VisitType.__attr_access__,
+    VisitType.SUBSCRIPT: VisitType.__subscript_access__,
+    VisitType.ATTR_SUBSCRIPT: _attr_subscript_pair_access,
+}
+
+# The members recorded in paths during traversal, bound once at module level
+_ATTRIBUTE = VisitType.ATTRIBUTE
+_ATTR_SUBSCRIPT = VisitType.ATTR_SUBSCRIPT
+
+# Paths are stored as linked (parent_path, step) pairs, so descending into a child is a single tuple allocation
+# rather than a copy of the whole path. The initially visited node has the empty path, None.
+# Paths are never modified once created, so visitors can keep the ones they are given without copying them.
+PathNode: TypeAlias = Union[Tuple['PathNode', Tuple[VisitType, VisitType.index_type]], None]
+
+def materialize_path(path: PathNode) -> List[Tuple[VisitType, VisitType.index_type]]:
+    """
+    Convert a linked path into a flat list of (VisitType, index) steps.
+
+    Args:
+    - path: The linked path, as passed to the visitor methods
+    Returns:
+    - The steps from the initially visited node to the node, in order
+    """
+    steps = []
+    while path is not None:
+        path, step = path
+        steps.append(step)
+    steps.reverse()
+    return steps
+
+# Field classification, so that traversal does not need to type-check every field of every node
+# The ast node classes document their fields in ASDL form, e.g. "FunctionDef(identifier name, arguments args, stmt* body, ...)"
+# Builtin ASDL types never hold nodes, every other type name refers to an ast node class
+_SCALAR_FIELD_TYPES = {'identifier', 'int', 'string', 'bytes', 'object', 'singleton', 'constant'}
+_ASDL_SIGNATURE = re.compile(r"^\w+\((.*)\)$")
+
+_NODE_FIELD = 1
+"""Field holding a single node (or None)"""
+_LIST_FIELD = 2
+"""Field holding a list of nodes (which may contain None, e.g. Dict.keys, or values put there by hand)"""
+_ANY_FIELD = 3
+"""Field of unknown type, checked at traversal time"""
+
+_FIELDS_CACHE: Dict[type, Tuple[Tuple[str, int], ...]] = {}
+"""
+Maps node classes to their (field, kind) pairs in field order, scalar fields are left out.
+The traversal reads these fields straight from the node's `__dict__`, which is where ast nodes store them,
+except for classes declaring `__slots__`, which may keep them in slots instead.
+"""
+
+_LEAF_TYPES: Set[type] = set()
+"""Node classes without any node or node-list fields (e.g. Load, Add, Pass, Constant), which have nothing to walk"""
+
+def _asdl_field_types(cls: type) -> Dict[str, str]:
+    "Helper function to read the ASDL field types of an ast node class from its docstring"
+    for klass in cls.__mro__:
+        if klass.__module__ != 'ast' or getattr(klass, '_fields', None) != cls._fields:
+            continue
+        match = _ASDL_SIGNATURE.match(klass.__doc__ or '')
+        if match is None:
+            break
+        field_types = {}
+        for declaration in match.group(1).split(', '):
+            field_type, _, field = declaration.partition(' ')
+            field_types[field] = field_type
+        return field_types
+    return {}
+
+def _field_kind(value: Any) -> Union[int, None]:
+    "Helper function to classify the value of a field of unknown type"
+    if isinstance(value, ast.AST):
+        return _NODE_FIELD
+    if isinstance(value, list):
+        return _LIST_FIELD
+    return None
+
+def _classify_fields(cls: type) -> Tuple[Tuple[str, int], ...]:
+    "Helper function to classify (and cache) the fields of a node class"
+    fields = getattr(cls, '_fields', ())
+    field_types = _asdl_field_types(cls) if fields else {}
+    classified = []
+    for field in fields:
+        field_type = field_types.get(field)
+        if field_type is None:
+            classified.append((field, _ANY_FIELD))
+        elif field_type.rstrip('*?') in _SCALAR_FIELD_TYPES:
+            continue
+        elif field_type.endswith('*'):
+            classified.append((field, _LIST_FIELD))
+        else:
+            classified.append((field, _NODE_FIELD))
+    _FIELDS_CACHE[cls] = tuple(classified)
+    if not classified:
+        _LEAF_TYPES.add(cls)
+    return _FIELDS_CACHE[cls]
+
+# Child pushers, one straight-line function per node class generated from its classified fields,
+# used by the iterative walk to queue a node's children without looping over and testing each field
+ChildPusher: TypeAlias = Callable[[ast.AST, PathNode, Callable[[Tuple[ast.AST, PathNode]], None]], None]
+
+_PUSH_CHILDREN: Dict[type, ChildPusher] = {}
+"""Maps node classes to the function pushing their (child, path) pairs onto a stack, last child first"""
+
+def _push_children_dynamic(node: ast.AST, path: PathNode, push: Callable[[Tuple[ast.AST, PathNode]], None]) -> None:
+    "Helper function to push the children of a node with fields of unknown type, checking each field's value"
+    children = []
+    for field, kind in _FIELDS_CACHE[type(node)]:
+        value = getattr(node, field, None)
+        if value is None:
+            continue
+        if kind == _ANY_FIELD:
+            kind = _field_kind(value)
+        if kind == _LIST_FIELD:
+            for i, item in enumerate(value):
+                if isinstance(item, ast.AST):
+                    children.append((item, (path, (_ATTR_SUBSCRIPT, (field, i)))))
+        elif kind == _NODE_FIELD and isinstance(value, ast.AST):
+            children.append((value, (path, (_ATTRIBUTE, field))))
+    children.reverse()
+    for child in children:
+        push(child)
+
+def _child_pusher(cls: type) -> ChildPusher:
+    "Helper function to generate (and cache) the child pusher of a node class"
+    fields = _FIELDS_CACHE.get(cls) or _classify_fields(cls)
+    for _, kind in fields:
+        if kind == _ANY_FIELD:
+            _PUSH_CHILDREN[cls] = _push_children_dynamic
+            return _push_children_dynamic
+    # Slotted classes may keep their fields outside the instance dict, so theirs are read with getattr
+    slotted = hasattr(cls, '__slots__')
+    lines = ["def push_children(node, path, push):"]
+    if not fields:
+        lines.append("    pass")
+    elif not slotted:
+        lines.append("    get = node.__dict__.get")
+    # Fields and list items are pushed in reverse, so that they are popped in order.
+    # Values that are not nodes (None, or anything else put in a field by hand) are skipped
+    for field, kind in reversed(fields):
+        if slotted:
+            lines.append(f"    value = getattr(node, {field!r}, None)")
+        else:
+            lines.append(f"    value = get({field!r})")
+        if kind == _NODE_FIELD:
+            lines.append("    if isinstance(value, AST):")
+            lines.append(f"        push((value, (path, (_ATTRIBUTE, {field!r}))))")
+        else:
+            lines.append("    if value:")
+            lines.append("        i = len(value)")
+            lines.append("        while i:")
+            lines.append("            i -= 1")
+            lines.append("            item = value[i]")
+            lines.append("            if isinstance(item, AST):")
+            lines.append(f"                push((item, (path, (_ATTR_SUBSCRIPT, ({field!r}, i)))))")
+    namespace: Dict[str, Any] = {'AST': ast.AST, '_ATTRIBUTE': _ATTRIBUTE, '_ATTR_SUBSCRIPT': _ATTR_SUBSCRIPT}
+    exec("\n".join(lines), namespace)
+    pusher = namespace['push_children']
+    pusher.__name__ = pusher.__qualname__ = f"push_children_{cls.__name__}"
+    _PUSH_CHILDREN[cls] = pusher
+    return pusher
+
+_SAME_NODE = object()
+"""Stored in the result cache of a pure visitor when the result of visiting a node was the node itself"""
+
+# Names of the value types a Constant node can hold, which visit_Constant forwards to `visit_{type name}` for
+_CONSTANT_TYPE_NAMES = {'int', 'float', 'complex', 'str', 'bytes', 'bool', 'NoneType', 'ellipsis', 'tuple', 'frozenset'}
+
+class _DescriptorVisitor:
+    """
+    Visitor cache entry for a visitor method that is not a plain function (e.g. a classmethod),
+    which looks the method up on the visitor so that it is bound the way the descriptor expects.
+    """
+    def __init__(self, method: str) -> None:
+        self.method = method
+
+    def __call__(self, visitor: Any, node: ast.AST, path: PathNode) -> Any:
+        return getattr(visitor, self.method)(node, path)
+
+class _VisitorDispatch(dict):
+    """
+    Maps node classes to the visitor function defined for them, or None if there is none.
+    Each node class is resolved from its name the first time it is looked up, so dispatching
+    a node afterwards is a single dict lookup on `type(node)`.
+    """
+    def __init__(self, by_name: Dict[str, Any]) -> None:
+        super().__init__()
+        self.by_name = by_name
+
+    def __missing__(self, node_type: type) -> Any:
+        visitor = self[node_type] = self.by_name.get(node_type.__name__)
+        return visitor
 
 # Now, modified NodeVisitor class that automatically passes pathing information
 # We'll only define the methods that need to be modified to allow for pathing information
@@ -101,13 +307,73 @@ class NodeVisitor(ast.NodeVisitor):
     to the visitor methods. This is done by using the VisitType enum class to store the
     specific traversal types. This helps record the structure of a tree as it is traversed.
     """
-    def visit(self, node: ast.AST, path: List[VisitType.index_type] = []) -> ast.AST:
+    _visit_cache: _VisitorDispatch = _VisitorDispatch({})
+    """Maps node classes to the visitor functions defined for them, built once per class"""
+    _walk_inline: bool = True
+    """Whether generic_visit may walk nodes without a visitor method itself, instead of dispatching them to visit"""
+    _has_legacy_constant: bool = False
+    """Whether the class defines a deprecated visitor for a constant's value type, like `visit_str`"""
+    pure: bool = False
+    """
+    Set to True by subclasses whose result for a node depends only on that node (not on its path or on earlier visits).
+    The result of visiting each node is then cached, and visiting the same node again returns it without walking its subtree.
+    This is a class attribute, read once when the class is defined, setting it on an instance has no effect.
+    """
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._build_visit_cache()
+
+    @classmethod
+    def _build_visit_cache(cls) -> None:
+        """
+        Collect every `visit_*` method of the class into `_visit_cache`.
+
+        Done once per class so that `visit` does not have to format a method name,
+        look it up, and check its signature for every node it dispatches.
+        """
+        # Only the methods defined by this class are warned about, inherited ones were warned about with their own class
+        for method, visitor in cls.__dict__.items():
+            if not method.startswith('visit_') and method not in ('visit', 'generic_visit'):
+                continue
+            # A mutable default path would be shared by every call that omits it, None is the convention
+            for default in getattr(visitor, '__defaults__', None) or ():
+                if isinstance(default, (list, dict, set)):
+                    warnings.warn(f"Visitor method '{cls.__name__}.{method}' has a mutable default argument, " \
+                                  + "use None as the default path instead", RuntimeWarning, 3)
+        cache = {}
+        for method in dir(cls):
+            if method.startswith('visit_'):
+                visitor = inspect.getattr_static(cls, method)
+                if not isinstance(visitor, FunctionType):
+                    # classmethods, staticmethods and other descriptors have to be bound through the instance
+                    visitor = _DescriptorVisitor(method)
+                else:
+                    # Every entry is checked, including those inherited from mixins that are not NodeVisitors
+                    code = visitor.__code__
+                    if code.co_argcount < 3:
+                        raise ValueError(f"Visitor method '{visitor.__qualname__}' of '{cls.__name__}' must have at least 3 arguments\n" \
+                                        + f"'{method} has {code.co_argcount}' arguments\n" \
+                                        + f"and was defined in '{code.co_filename}:{code.co_firstlineno}'")
+                cache[method[len('visit_'):]] = visitor
+        # visit_Constant only exists to forward to the deprecated type-specific visitors,
+        # so Constant nodes are walked like any other node unless the class defines one of them
+        cls._has_legacy_constant = not _CONSTANT_TYPE_NAMES.isdisjoint(cache)
+        if not cls._has_legacy_constant and cache['Constant'] is NodeVisitor.visit_Constant:
+            del cache['Constant']
+        cls._visit_cache = _VisitorDispatch(cache)
+        # Nodes without a visitor method can only be walked inline by generic_visit while visit and generic_visit
+        # are the ones defined here, otherwise every child has to be dispatched through the overridden visit
+        # Pure visitors also dispatch every node through visit, which is where their results are cached
+        cls._walk_inline = cls.visit.__module__ == __name__ and cls.generic_visit.__module__ == __name__ and not cls.pure
+
+    def visit(self, node: ast.AST, path: PathNode = None) -> ast.AST:
         """
         Visit a node and call the visitor function for it.
 
         Args:
         - node: The node to visit
-        - path: The path to the node from the initially visited node
+        - path: The path to the node from the initially visited node (see `PathNode`)
         Returns:
         - The final node after visiting all its children
         
@@ -115,22 +381,50 @@ class NodeVisitor(ast.NodeVisitor):
         - All children must be manually visited if any visit method is overridden, usually in the form of:
             `node = self.generic_visit(node, path)`
         """
-        method = 'visit_' + node.__class__.__name__
-        visitor = getattr(self, method, self.generic_visit)
-        if visitor.__code__.co_argcount < 3:
-            raise ValueError(f"Visitor method '{method}' must have at least 3 arguments\n" \
-                            + f"'{method} has {visitor.__code__.co_argcount}' arguments\n" \
-                            + f"and was defined in '{visitor.__code__.co_filename}'\n" \
-                            + "\n" + "\n".join(__recent_call_stack__()))
-        return visitor(node, path)
+        if type(self).pure:
+            return self._visit_memoized(node, path)
+        visitor = self._visit_cache[type(node)]
+        if visitor is None:
+            return self.generic_visit(node, path)
+        return visitor(self, node, path)
+
+    def _visit_memoized(self, node: ast.AST, path: PathNode = None) -> ast.AST:
+        """
+        Visit a node through the result cache of a pure visitor.
+
+        Args:
+        - node: The node to visit
+        - path: The path to the node from the initially visited node (see `PathNode`)
+        Returns:
+        - The cached result for the node, or the result of visiting it
+        """
+        try:
+            cache = self._result_cache
+        except AttributeError:
+            # Created lazily, so that subclasses don't need to call NodeVisitor.__init__
+            cache = self._result_cache = WeakKeyDictionary()
+        try:
+            result = cache[node]
+        except KeyError:
+            pass
+        else:
+            return node if result is _SAME_NODE else result
+        visitor = self._visit_cache[type(node)]
+        if visitor is None:
+            result = self.generic_visit(node, path)
+        else:
+            result = visitor(self, node, path)
+        # Storing the node as its own value would keep it (and its whole tree) alive through the weak cache
+        cache[node] = _SAME_NODE if result is node else result
+        return result
     
-    def generic_visit(self, node: ast.AST, path: List[VisitType.index_type]) -> ast.AST:
+    def generic_visit(self, node: ast.AST, path: PathNode = None) -> ast.AST:
         """
         Called if no explicit visitor function exists for a node.
 
         Args:
         - node: The node to visit
-        - path: The path to the node from the initially visited node
+        - path: The path to the node from the initially visited node (see `PathNode`)
         Returns:
         - The final node after visiting all its children
         
@@ -138,25 +432,88 @@ class NodeVisitor(ast.NodeVisitor):
         - All children must be manually visited if any visit method is overridden, usually in the form of:
             `node = self.generic_visit(node, path)`
         """
-        for field, value in ast.iter_fields(node):
-            if isinstance(value, list):
-                for i, item in enumerate(value):
-                    if isinstance(item, ast.AST):
-                        self.visit(item, path + [(VisitType.ATTR_SUBSCRIPT, (field, i))])
-            elif isinstance(value, ast.AST):
-                self.visit(value, path + [(VisitType.ATTRIBUTE, field)])
-        return node
+        node_type = type(node)
+        leaf_types = _LEAF_TYPES
+        if node_type in leaf_types:
+            return node
+        # The subtree is walked with an explicit stack instead of recursing through visit,
+        # only nodes with a visitor method of their own are dispatched to it
+        visit_override = None if self._walk_inline else type(self).visit
+        # Bind the names used for every node to locals once per walk
+        get_visitor = self._visit_cache.__getitem__
+        get_pusher = _PUSH_CHILDREN.get
+        child_pusher = _child_pusher
+        node_class = type
+        root = node
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        while True:
+            # Queue the children of the node, they are pushed last first so that they are popped in field order
+            (get_pusher(node_type) or child_pusher(node_type))(node, path, push)
+            # Dispatch queued nodes until one has to be walked generically
+            while stack:
+                node, path = pop()
+                node_type = node_class(node)
+                visitor = visit_override or get_visitor(node_type)
+                if visitor is None:
+                    if node_type in leaf_types:
+                        continue
+                    break
+                visitor(self, node, path)
+            else:
+                return root
     
-    def visit_Constant(self, node: ast.Constant, path: List[VisitType.index_type]) -> ast.AST:
+    def iter_subtree(self, root: ast.AST, path: PathNode = None) -> Iterator[Tuple[ast.AST, PathNode]]:
+        """
+        Iterate over a node and all of its descendants, without calling any visitor methods.
+
+        Args:
+        - root: The node to start from
+        - path: The path to the root node (see `PathNode`)
+        Yields:
+        - Every node of the subtree with its path, in the same order as they would be visited
+
+        Note:
+        - The subtree is walked iteratively, so this is preferable to a recursive visitor
+          when only looking for nodes, e.g. `for node, path in self.iter_subtree(tree): ...`
+        """
+        get_pusher = _PUSH_CHILDREN.get
+        stack = [(root, path)]
+        push = stack.append
+        pop = stack.pop
+        while stack:
+            node, path = pop()
+            yield node, path
+            node_type = type(node)
+            (get_pusher(node_type) or _child_pusher(node_type))(node, path, push)
+
+    def find_all(self, root: ast.AST, node_class: Union[type, Tuple[type, ...]]) -> Iterator[ast.AST]:
+        """
+        Find all nodes of the given class(es) in a subtree, without calling any visitor methods.
+
+        Args:
+        - root: The node to start from (included in the search)
+        - node_class: The node class, or tuple of node classes, to look for
+        Yields:
+        - The matching nodes, in the same order as they would be visited
+        """
+        for node, _ in self.iter_subtree(root):
+            if isinstance(node, node_class):
+                yield node
+
+    def visit_Constant(self, node: ast.Constant, path: PathNode = None) -> ast.AST:
         """
         Visit a Constant node.
 
         Args:
         - node: The Constant node to visit
-        - path: The path to the node from the initially visited node
+        - path: The path to the node from the initially visited node (see `PathNode`)
         Returns:
         - The final node after visiting all its children
         """
+        if not self._has_legacy_constant:
+            return self.generic_visit(node, path)
         value = node.value
         type_name = type(value).__name__
         if type_name is not None:
@@ -166,13 +523,13 @@ class NodeVisitor(ast.NodeVisitor):
             except AttributeError:
                 pass
             else:
-                import warnings
                 warnings.warn(f"{method} is deprecated; add visit_Constant",
                               DeprecationWarning, 2)
                 return visitor(node, path)
         return self.generic_visit(node, path)
 
-
+# The base class is not covered by __init_subclass__, so build its cache explicitly
+NodeVisitor._build_visit_cache()
     
 # Next is the improved version of the NodeTransformer class
 # Just like the standard NodeTransformer, it inherits from NodeVisitor but with additional functionality
@@ -183,14 +540,21 @@ class NodeTransformer(NodeVisitor):
     Modified version of the ast.NodeTransformer class that automatically passes pathing information
     to the visitor methods. This is done by using the VisitType enum class to store the
     specific traversal types. This helps record the structure of a tree as it is traversed.
+
+    Transformers cannot be `pure`, since they modify the tree as they visit it.
     """
-    def generic_visit(self, node: ast.AST, path: List[VisitType.index_type]) -> ast.AST:
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        if cls.pure:
+            raise ValueError(f"NodeTransformer '{cls.__name__}' cannot be pure, as it modifies the tree it visits")
+
+    def generic_visit(self, node: ast.AST, path: PathNode = None) -> ast.AST:
         """
         Called if no explicit visitor function exists for a node.
 
         Args:
         - node: The node to visit
-        - path: The path to the node from the initially visited node
+        - path: The path to the node from the initially visited node (see `PathNode`)
         Returns:
         - The final node after visiting all its children
 
@@ -198,26 +562,93 @@ class NodeTransformer(NodeVisitor):
         - All children must be manually visited if any visit method is overridden, usually in the form of:
             `node = self.generic_visit(node, path)`
         """
-        for field, value in ast.iter_fields(node):
-            if isinstance(value, list):
+        if type(node) in _LEAF_TYPES:
+            return node
+        # Each partially transformed node is a suspended _transform_children generator on the stack,
+        # which keeps the state of the list it is rebuilding while one of its children is walked
+        root = node
+        stack = [self._transform_children(node, path)]
+        while stack:
+            for child, child_path in stack[-1]:
+                stack.append(self._transform_children(child, child_path))
+                break
+            else:
+                stack.pop()
+        return root
+
+    def _transform_children(self, node: ast.AST, path: PathNode = None) -> Iterator[Tuple[ast.AST, PathNode]]:
+        """
+        Transform the children of a node, yielding those that have to be walked generically.
+
+        Args:
+        - node: The node whose children to transform
+        - path: The path to the node from the initially visited node (see `PathNode`)
+        Yields:
+        - The children without a visitor method, with their paths. They are kept in place,
+        and must be fully walked before the generator is resumed
+        """
+        visit_override = None if self._walk_inline else type(self).visit
+        # Bind the names used for every child to locals
+        get_visitor = self._visit_cache.__getitem__
+        attribute = _ATTRIBUTE
+        attr_subscript = _ATTR_SUBSCRIPT
+        node_class = type
+        leaf_types = _LEAF_TYPES
+        AST = ast.AST
+        node_type = type(node)
+        # Slotted node classes may keep their fields outside the instance dict
+        slotted = hasattr(node_type, '__slots__')
+        node_dict = node.__dict__
+        node_get = node_dict.get
+        for field, kind in _FIELDS_CACHE.get(node_type) or _classify_fields(node_type):
+            value = getattr(node, field, None) if slotted else node_get(field)
+            if value is None:
+                continue
+            if kind == _ANY_FIELD:
+                kind = _field_kind(value)
+            if kind == _LIST_FIELD:
+                # Items that are not nodes (None, or anything else put in the list) are kept without being visited
+                n = len(value)
                 new_values = []
-                for i, item in enumerate(value):
-                    if isinstance(item, ast.AST):
-                        item = self.visit(item, path + [(VisitType.ATTR_SUBSCRIPT, (field, i))])
-                        if item is not None:
-                            new_values.append(item)
-                            continue
-                        elif not isinstance(item, ast.AST):
-                            new_values.extend(item)
-                            continue
-                    new_values.append(item)
+                append = new_values.append
+                i = 0
+                while i < n:
+                    item = value[i]
+                    if isinstance(item, AST):
+                        item_path = (path, (attr_subscript, (field, i)))
+                        item_type = node_class(item)
+                        visitor = visit_override or get_visitor(item_type)
+                        if visitor is None:
+                            # Leaves are kept as they are, without being walked
+                            if item_type not in leaf_types:
+                                yield item, item_path
+                        else:
+                            item = visitor(self, item, item_path)
+                            if item is None:
+                                i += 1
+                                continue
+                            elif not isinstance(item, AST):
+                                new_values.extend(item)
+                                i += 1
+                                continue
+                    append(item)
+                    i += 1
                 value[:] = new_values
-            elif isinstance(value, ast.AST):
-                new_node = self.visit(value, path + [(VisitType.ATTRIBUTE, field)])
-                if new_node is None:
-                    delattr(node, field)
+            elif kind == _NODE_FIELD and isinstance(value, AST):
+                value_path = (path, (attribute, field))
+                value_type = node_class(value)
+                visitor = visit_override or get_visitor(value_type)
+                if visitor is None:
+                    if value_type not in leaf_types:
+                        yield value, value_path
+                    continue
+                new_node = visitor(self, value, value_path)
+                if slotted:
+                    if new_node is None:
+                        delattr(node, field)
+                    else:
+                        setattr(node, field, new_node)
+                elif new_node is None:
+                    node_dict.pop(field, None)
                 else:
-                    setattr(node, field, new_node)
-        return node
-
-                        
+                    node_dict[field] = new_node
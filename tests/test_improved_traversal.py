@@ -0,0 +1,328 @@
+# Tests for improved_traversal.py
+# Run from the repository root with: PYTHONPATH=src python -m unittest discover tests
+import ast
+import gc
+import sys
+import unittest
+
+from ast2Py import NodeVisitor, NodeTransformer, VisitType
+from ast2Py.improved_traversal import _FIELDS_CACHE, _LEAF_TYPES, materialize_path
+
+SOURCE = "def f(a, b=1):\n    return a + b\n\nx = f(2, [3, 4])\n"
+
+
+def replay(root, path):
+    "Follow the steps of a path from the root node"
+    node = root
+    for visit_type, index in materialize_path(path):
+        node = visit_type(node, index)
+    return node
+
+
+class DispatchTest(unittest.TestCase):
+    def test_classmethod_and_staticmethod_visitors(self):
+        seen = []
+        class Visitor(NodeVisitor):
+            @classmethod
+            def visit_Name(cls, node, path):
+                seen.append((cls, node.id))
+            @staticmethod
+            def visit_arg(node, path):
+                seen.append((None, node.arg))
+
+        Visitor().visit(ast.parse(SOURCE))
+        self.assertEqual(seen, [(None, 'a'), (None, 'b'), (Visitor, 'a'), (Visitor, 'b'), (Visitor, 'x'), (Visitor, 'f')])
+
+    def test_visitor_signatures_are_checked_at_class_definition(self):
+        class Mixin:
+            def visit_Name(self, node):
+                pass
+
+        with self.assertRaises(ValueError):
+            class FromMixin(Mixin, NodeVisitor):
+                pass
+        with self.assertRaises(ValueError):
+            class Direct(NodeVisitor):
+                def visit_Name(self, node):
+                    pass
+
+    def test_leaf_visitors_are_dispatched(self):
+        seen = []
+        class Visitor(NodeVisitor):
+            def visit_Load(self, node, path):
+                seen.append(materialize_path(path)[-1])
+
+        Visitor().visit(ast.parse("x = y"))
+        self.assertEqual(seen, [(VisitType.ATTRIBUTE, 'ctx')])
+        self.assertIn(ast.Load, _LEAF_TYPES)
+
+    def test_legacy_constant_visitors(self):
+        seen = []
+        class Legacy(NodeVisitor):
+            def visit_str(self, node, path):
+                seen.append(node.value)
+
+        with self.assertWarns(DeprecationWarning):
+            Legacy().visit(ast.parse("x = 'a' + 1"))
+        self.assertEqual(seen, ['a'])
+        # Without a legacy visitor, Constant nodes are walked inline rather than dispatched to visit_Constant
+        self.assertIsNone(NodeVisitor._visit_cache[ast.Constant])
+        self.assertIsNotNone(Legacy._visit_cache[ast.Constant])
+
+    def test_mutable_default_path_warns_at_the_class_statement(self):
+        with self.assertWarnsRegex(RuntimeWarning, "mutable default argument") as caught:
+            lineno = sys._getframe().f_lineno + 1
+            class Visitor(NodeVisitor):
+                def visit_Name(self, node, path=[]):
+                    pass
+        self.assertEqual((caught.filename, caught.lineno), (__file__, lineno))
+
+
+class TransformerListTest(unittest.TestCase):
+    def test_returned_sequences_are_spliced_into_lists(self):
+        class Transformer(NodeTransformer):
+            def visit_Pass(self, node, path):
+                return [node, ast.Expr(ast.Name('after'))]
+
+        tree = ast.parse("pass\nx\npass\n")
+        Transformer().visit(tree)
+        self.assertEqual(ast.unparse(tree), "pass\nafter\nx\npass\nafter")
+
+    def test_none_removes_list_items(self):
+        class Transformer(NodeTransformer):
+            def visit_Pass(self, node, path):
+                return None
+
+        tree = ast.parse("pass\nx\npass\ny\n")
+        Transformer().visit(tree)
+        self.assertEqual(ast.unparse(tree), "x\ny")
+
+
+class NonNodeItemTest(unittest.TestCase):
+    def test_transformer_keeps_non_node_items(self):
+        class Transformer(NodeTransformer):
+            def visit_Name(self, node, path):
+                return ast.Name(node.id.upper(), node.ctx)
+
+        tree = ast.parse(SOURCE)
+        tree.body.append("junk")
+        Transformer().visit(tree)
+        NodeTransformer().visit(tree)
+        self.assertEqual(tree.body[-1], "junk")
+        self.assertEqual(ast.unparse(tree.body[-2]), "X = F(2, [3, 4])")
+        self.assertNotIn(str, _FIELDS_CACHE)
+        self.assertNotIn(str, _LEAF_TYPES)
+
+    def test_visitor_skips_non_node_items(self):
+        seen = []
+        class Visitor(NodeVisitor):
+            def visit_str(self, node, path):
+                seen.append(node)
+            def visit_Name(self, node, path):
+                seen.append(node.id)
+
+        tree = ast.parse(SOURCE)
+        tree.body.append("junk")
+        tree.body[0].returns = "junk"
+        Visitor().visit(tree)
+        self.assertEqual(seen, ['a', 'b', 'x', 'f'])
+        self.assertEqual([node.arg for node in NodeVisitor().find_all(tree, ast.arg)], ['a', 'b'])
+        self.assertNotIn(str, _FIELDS_CACHE)
+
+
+class VisitTypeTest(unittest.TestCase):
+    def test_str(self):
+        self.assertEqual([str(visit_type) for visit_type in (VisitType.ATTRIBUTE, VisitType.SUBSCRIPT, VisitType.ATTR_SUBSCRIPT)],
+                         ["Attribute", "Subscript", "Attribute and Subscript"])
+        self.assertEqual(str(VisitType.index_type), "index_type")
+
+    def test_access(self):
+        node = ast.parse(SOURCE)
+        self.assertIs(VisitType.ATTRIBUTE(node, 'body'), node.body)
+        self.assertIs(VisitType.SUBSCRIPT(node.body, 1), node.body[1])
+        self.assertIs(VisitType.ATTR_SUBSCRIPT(node, ('body', 0)), node.body[0])
+
+    def test_invalid_visit_type(self):
+        # index_type is a member of the enum too, but has no access method
+        with self.assertRaisesRegex(ValueError, "Invalid VisitType 'index_type'"):
+            VisitType.index_type([], 0)
+
+
+class PathTest(unittest.TestCase):
+    def test_every_path_replays_to_its_node(self):
+        with open(ast.__file__, encoding='utf-8') as file:
+            tree = ast.parse(file.read())
+        visited = []
+        class Recorder(NodeVisitor):
+            def visit(self, node, path=None):
+                visited.append((node, path))
+                return super().visit(node, path)
+
+        Recorder().visit(tree)
+        self.assertEqual(len(visited), sum(1 for _ in ast.walk(tree)))
+        for node, path in visited:
+            self.assertIs(replay(tree, path), node)
+
+
+class SubtreeTest(unittest.TestCase):
+    def test_iter_subtree_matches_visit_order_and_paths(self):
+        visited = []
+        class Recorder(NodeVisitor):
+            def visit(self, node, path=None):
+                visited.append((node, path))
+                return super().visit(node, path)
+
+        tree = ast.parse(SOURCE)
+        Recorder().visit(tree)
+        walked = list(NodeVisitor().iter_subtree(tree))
+        self.assertEqual(len(walked), len(visited))
+        for (node, path), (visited_node, visited_path) in zip(walked, visited):
+            self.assertIs(node, visited_node)
+            self.assertEqual(path, visited_path)
+            self.assertIs(replay(tree, path), node)
+
+    def test_find_all_accepts_a_tuple_of_classes(self):
+        tree = ast.parse(SOURCE)
+        found = NodeVisitor().find_all(tree, (ast.Name, ast.arg))
+        self.assertEqual([getattr(node, 'id', None) or node.arg for node in found], ['a', 'b', 'a', 'b', 'x', 'f'])
+        self.assertEqual(len(list(NodeVisitor().find_all(tree, ast.Constant))), 4)
+
+
+class DeepTreeTest(unittest.TestCase):
+    DEPTH = 5000
+
+    def deep_tree(self):
+        "a + a + ... + a, nested deeper than the recursion limit"
+        expr = ast.Name('a', ast.Load())
+        for _ in range(self.DEPTH):
+            expr = ast.BinOp(expr, ast.Add(), ast.Name('a', ast.Load()))
+        return ast.Expression(expr)
+
+    def test_deep_tree_is_visited(self):
+        self.assertLess(sys.getrecursionlimit(), self.DEPTH)
+        names = []
+        class Visitor(NodeVisitor):
+            def visit_Name(self, node, path):
+                names.append(node)
+
+        Visitor().visit(self.deep_tree())
+        self.assertEqual(len(names), self.DEPTH + 1)
+
+    def test_deep_tree_is_transformed(self):
+        class Transformer(NodeTransformer):
+            def visit_Name(self, node, path):
+                return ast.Constant(1)
+
+        tree = Transformer().visit(self.deep_tree())
+        self.assertEqual(len(list(NodeVisitor().find_all(tree, ast.Constant))), self.DEPTH + 1)
+        self.assertEqual(list(NodeVisitor().find_all(tree, ast.Name)), [])
+
+
+class MixedNode(ast.AST):
+    _fields = ('items',)
+
+
+class MixedListTest(unittest.TestCase):
+    def test_nodes_in_mixed_lists_are_visited(self):
+        seen = []
+        class Visitor(NodeVisitor):
+            def visit_Name(self, node, path):
+                seen.append(node.id)
+
+        Visitor().visit(MixedNode(items=[ast.Name('a'), 'str', ast.Name('b')]))
+        self.assertEqual(seen, ['a', 'b'])
+
+    def test_nodes_in_mixed_lists_are_transformed(self):
+        class Transformer(NodeTransformer):
+            def visit_Name(self, node, path):
+                return ast.Name(node.id.upper())
+
+        node = Transformer().visit(MixedNode(items=[ast.Name('a'), 'str', ast.Name('b')]))
+        self.assertEqual([getattr(item, 'id', item) for item in node.items], ['A', 'str', 'B'])
+
+
+class SlottedNode(ast.AST):
+    __slots__ = _fields = ('child',)
+
+
+class SlottedExpr(ast.Expr):
+    __slots__ = ('value',)
+
+
+class SlottedFieldsTest(unittest.TestCase):
+    def test_slotted_fields_are_visited(self):
+        seen = []
+        class Visitor(NodeVisitor):
+            def visit_Name(self, node, path):
+                seen.append(node.id)
+
+        module = ast.Module(body=[SlottedExpr(ast.Name('a')), ast.Expr(SlottedNode(child=ast.Name('b')))], type_ignores=[])
+        Visitor().visit(module)
+        self.assertEqual(seen, ['a', 'b'])
+
+    def test_slotted_fields_are_transformed(self):
+        class Transformer(NodeTransformer):
+            def visit_Name(self, node, path):
+                return ast.Name(node.id.upper())
+
+        slotted = SlottedNode(child=ast.Name('b'))
+        module = ast.Module(body=[SlottedExpr(ast.Name('a')), ast.Expr(slotted)], type_ignores=[])
+        Transformer().visit(module)
+        self.assertEqual((module.body[0].value.id, slotted.child.id), ('A', 'B'))
+
+
+class PureVisitorTest(unittest.TestCase):
+    def test_result_cache_releases_dropped_trees(self):
+        class Names(NodeVisitor):
+            pure = True
+            def visit_Name(self, node, path):
+                return node.id
+
+        visitor = Names()
+        tree = ast.parse(SOURCE)
+        visitor.visit(tree)
+        cached = len(visitor._result_cache)
+        del tree
+        gc.collect()
+        # Only the context and operator singletons shared by every parsed tree (e.g. Load, Add) may remain
+        remaining = list(visitor._result_cache.keys())
+        self.assertLess(len(remaining), cached)
+        self.assertTrue(all(not node._fields for node in remaining), remaining)
+
+    def test_cached_results_are_returned(self):
+        class Count(NodeVisitor):
+            pure = True
+            def __init__(self):
+                self.calls = 0
+            def visit_Name(self, node, path):
+                self.calls += 1
+                return node.id
+
+        visitor = Count()
+        tree = ast.parse(SOURCE)
+        self.assertIs(visitor.visit(tree), tree)
+        calls = visitor.calls
+        self.assertIs(visitor.visit(tree), tree)
+        self.assertEqual(visitor.calls, calls)
+
+    def test_pure_is_only_read_from_the_class(self):
+        class Count(NodeVisitor):
+            def __init__(self):
+                self.calls = 0
+            def visit_Name(self, node, path):
+                self.calls += 1
+
+        visitor = Count()
+        visitor.pure = True
+        tree = ast.parse(SOURCE)
+        visitor.visit(tree)
+        visitor.visit(tree)
+        self.assertEqual(visitor.calls, 8)
+        transformer = NodeTransformer()
+        transformer.pure = True
+        self.assertIs(transformer.visit(tree), tree)
+        self.assertEqual(ast.unparse(tree), ast.unparse(ast.parse(SOURCE)))
+
+
+if __name__ == "__main__":
+    unittest.main()